@@ -0,0 +1,169 @@
+"""
+Admission control for the prediction and retraining endpoints.
+
+Requests are admitted into named lanes, each with its own concurrency limit
+and bounded wait queue. Lanes marked as shared also draw from a common pool
+of worker slots; when a slot frees up, waiters in the highest-priority lane
+are admitted first, so interactive single-row predictions overtake bulk
+traffic. Within a lane, waiters are admitted in arrival order. Requests
+are rejected instead of queued without bound:
+
+- 429 when a lane's wait queue is full
+- 503 when a queued request is not admitted within the queue timeout
+"""
+
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted."""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _Lane:
+    def __init__(self, name, max_concurrent, max_queue, priority, shared):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.priority = priority
+        self.shared = shared
+        self.running = 0
+        # Tickets of waiting requests, in arrival order
+        self.queue = deque()
+        self.tickets = itertools.count()
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.avg_service_time = 0.0
+
+
+class AdmissionController:
+    """
+    Bounded, prioritized admission of concurrent requests.
+    """
+
+    def __init__(self, shared_capacity=4, queue_timeout=10.0):
+        self.shared_capacity = shared_capacity
+        self.queue_timeout = queue_timeout
+        self.shared_running = 0
+        self.lanes = {}
+        self._cond = threading.Condition()
+
+    def add_lane(self, name, max_concurrent, max_queue, priority=0, shared=True):
+        """
+        Register a lane.
+
+        Args:
+            name: Lane name
+            max_concurrent: Maximum requests of this lane running at once
+            max_queue: Maximum requests of this lane waiting for admission
+            priority: Higher priority lanes are admitted first to shared slots
+            shared: Whether the lane draws from the shared worker slots
+        """
+        self.lanes[name] = _Lane(name, max_concurrent, max_queue, priority, shared)
+
+    def _can_run(self, lane):
+        if lane.running >= lane.max_concurrent:
+            return False
+        if not lane.shared:
+            return True
+        if self.shared_running >= self.shared_capacity:
+            return False
+        # Leave free shared slots to higher-priority waiters
+        return not any(
+            other.shared and other.queue and other.priority > lane.priority
+            for other in self.lanes.values()
+        )
+
+    def _retry_after(self, lane):
+        """Estimate seconds until a slot is likely to free up."""
+        backlog = (lane.running + len(lane.queue)) / max(lane.max_concurrent, 1)
+        return max(1, math.ceil(lane.avg_service_time * backlog))
+
+    @contextmanager
+    def admit(self, lane_name):
+        """
+        Context manager holding a slot in the given lane for its duration.
+
+        Raises:
+            AdmissionRejected: If the lane's queue is full or the wait times out
+        """
+        lane = self.lanes[lane_name]
+
+        with self._cond:
+            if lane.queue or not self._can_run(lane):
+                if len(lane.queue) >= lane.max_queue:
+                    lane.rejected_queue_full += 1
+                    raise AdmissionRejected(
+                        f"Too many pending '{lane_name}' requests",
+                        429, self._retry_after(lane)
+                    )
+
+                ticket = next(lane.tickets)
+                lane.queue.append(ticket)
+                try:
+                    # Only the oldest waiter of a lane may take a free slot
+                    admitted = self._cond.wait_for(
+                        lambda: lane.queue[0] == ticket and self._can_run(lane),
+                        timeout=self.queue_timeout
+                    )
+                finally:
+                    lane.queue.remove(ticket)
+                    # A departing waiter may unblock lower-priority lanes
+                    self._cond.notify_all()
+
+                if not admitted:
+                    lane.rejected_timeout += 1
+                    raise AdmissionRejected(
+                        f"Server busy, '{lane_name}' request timed out in queue",
+                        503, self._retry_after(lane)
+                    )
+
+            lane.running += 1
+            lane.admitted += 1
+            if lane.shared:
+                self.shared_running += 1
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                lane.running -= 1
+                if lane.shared:
+                    self.shared_running -= 1
+                # Exponentially weighted average used for Retry-After
+                lane.avg_service_time = 0.8 * lane.avg_service_time + 0.2 * elapsed
+                self._cond.notify_all()
+
+    def get_stats(self):
+        """Return queue depth, concurrency and rejection counters per lane."""
+        with self._cond:
+            return {
+                'shared_capacity': self.shared_capacity,
+                'shared_running': self.shared_running,
+                'lanes': {
+                    lane.name: {
+                        'priority': lane.priority,
+                        'max_concurrent': lane.max_concurrent,
+                        'max_queue': lane.max_queue,
+                        'running': lane.running,
+                        'queue_depth': len(lane.queue),
+                        'admitted': lane.admitted,
+                        'rejected_queue_full': lane.rejected_queue_full,
+                        'rejected_timeout': lane.rejected_timeout,
+                        'avg_service_time': lane.avg_service_time
+                    }
+                    for lane in self.lanes.values()
+                }
+            }
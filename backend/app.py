@@ -1,14 +1,96 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from functools import wraps
+from werkzeug.exceptions import RequestEntityTooLarge
 import pandas as pd
 import os
 import json
 from model import ExoplanetClassifier
 from data_processor import ExoplanetDataProcessor
+from catalog import PredictionCatalog, ID_COLUMNS
+from training_cache import TrainingCache
+from admission import AdmissionController, AdmissionRejected
+
+# Request size limits, enforced before the body is parsed
+MAX_JSON_BYTES = 10 * 1024 * 1024
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+MAX_BATCH_ROWS = 50000
+# JSON bodies up to this size are treated as interactive predictions
+INTERACTIVE_MAX_BYTES = 16 * 1024
+# Catalog sources must live where download_data.py writes its tables
+DATA_DIR = 'data'
 
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
 CORS(app)
 
+# Admission control: interactive predictions take priority over bulk traffic
+# for the shared worker slots; retraining runs one at a time in its own lane
+admission = AdmissionController(shared_capacity=4, queue_timeout=10.0)
+admission.add_lane('interactive', max_concurrent=4, max_queue=64, priority=1)
+admission.add_lane('bulk', max_concurrent=2, max_queue=8, priority=0)
+admission.add_lane('retrain', max_concurrent=1, max_queue=0, shared=False)
+
+def _prediction_lane():
+    """Small JSON bodies are interactive; uploads, large batches and bodies of unknown size are bulk."""
+    if request.is_json and request.content_length is not None and request.content_length <= INTERACTIVE_MAX_BYTES:
+        return 'interactive'
+    return 'bulk'
+
+def _body_too_large(max_bytes):
+    """Response for bodies exceeding max_bytes."""
+    return jsonify({
+        'success': False,
+        'error': f'Request body too large (limit {max_bytes} bytes)'
+    }), 413
+
+def admitted(lane):
+    """
+    Reject oversized bodies, then run the view inside an admission slot.
+    
+    Args:
+        lane: Lane name, or a callable returning the lane for the current request
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            is_upload = request.mimetype == 'multipart/form-data'
+            max_bytes = MAX_UPLOAD_BYTES if is_upload else MAX_JSON_BYTES
+            if request.content_length is not None and request.content_length > max_bytes:
+                return _body_too_large(max_bytes)
+            
+            # Without Content-Length (chunked bodies) the limit is enforced while
+            # reading, so read the body here rather than inside the view
+            request.max_content_length = max_bytes
+            if request.content_length is None:
+                try:
+                    if is_upload:
+                        request.files
+                    else:
+                        # Reads stop at the limit; probing past it raises if more was sent
+                        request.get_data()
+                        request.stream.read(1)
+                except RequestEntityTooLarge:
+                    return _body_too_large(max_bytes)
+            
+            try:
+                with admission.admit(lane() if callable(lane) else lane):
+                    return view(*args, **kwargs)
+            except AdmissionRejected as e:
+                response = jsonify({'success': False, 'error': str(e)})
+                response.status_code = e.status
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+        return wrapper
+    return decorator
+
+def _batch_too_large():
+    """Response for batches exceeding MAX_BATCH_ROWS."""
+    return jsonify({
+        'success': False,
+        'error': f'Too many rows (limit {MAX_BATCH_ROWS})'
+    }), 413
+
 # Initialize classifier
 classifier = ExoplanetClassifier(model_type='ensemble')
 
@@ -22,12 +104,24 @@ except FileNotFoundError:
     classifier.save()
     print("Model trained and saved")
 
+# Memoized training runs for repeated retrain requests
+training_cache = TrainingCache()
+
+# Precomputed predictions for catalogued objects
+catalog = PredictionCatalog()
+try:
+    if catalog.get_sources() and catalog.active_version() != classifier.version:
+        catalog.refresh(classifier)
+except Exception as e:
+    print(f"Catalog refresh failed: {e}")
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
     return jsonify({'status': 'healthy', 'message': 'Exoplanet API is running'})
 
 @app.route('/api/predict', methods=['POST'])
+@admitted(_prediction_lane)
 def predict():
     """
     Predict exoplanet classification for input data.
@@ -45,13 +139,19 @@ def predict():
                 # Single prediction
                 df = pd.DataFrame([data])
             
+            if len(df) > MAX_BATCH_ROWS:
+                return _batch_too_large()
+            
             results = classifier.predict(df)
             return jsonify({'success': True, 'predictions': results})
         
         elif 'file' in request.files:
             # CSV file upload
             file = request.files['file']
-            df = pd.read_csv(file)
+            df = pd.read_csv(file, nrows=MAX_BATCH_ROWS + 1)
+            if len(df) > MAX_BATCH_ROWS:
+                return _batch_too_large()
+            
             results = classifier.predict(df)
             return jsonify({'success': True, 'predictions': results})
         
@@ -61,6 +161,158 @@ def predict():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/cascade-predict', methods=['POST'])
+@admitted(_prediction_lane)
+def cascade_predict():
+    """
+    Cascade prediction: a single ensemble member scores every row and only
+    rows inside the uncertainty band are escalated to the full ensemble.
+    
+    Query parameters: lower, upper, first_stage, first_stage_trees, agreement
+    """
+    try:
+        data = request.json
+        
+        if data is None:
+            return jsonify({'success': False, 'error': 'No data provided'}), 400
+        
+        df = pd.DataFrame(data if isinstance(data, list) else [data])
+        if len(df) > MAX_BATCH_ROWS:
+            return _batch_too_large()
+        
+        result = classifier.predict_cascade(
+            df,
+            lower=request.args.get('lower', 0.1, type=float),
+            upper=request.args.get('upper', 0.9, type=float),
+            first_stage=request.args.get('first_stage', 'xgb'),
+            first_stage_trees=request.args.get('first_stage_trees', type=int),
+            compute_agreement=request.args.get('agreement', 'false').lower() == 'true'
+        )
+        
+        return jsonify({
+            'success': True,
+            'predictions': result['predictions'],
+            'cascade': result['cascade']
+        })
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/sweep', methods=['POST'])
+@admitted(_prediction_lane)
+def sensitivity_sweep():
+    """
+    What-if sweep: probability of CONFIRMED as one or two features vary.
+    Accepts a base candidate ("candidate") or a list ("candidates"), a
+    "grid" mapping feature names to value lists or {start, stop, num, log},
+    and optionally "features" giving the axis order of the returned surface.
+    """
+    try:
+        data = request.json
+        
+        if not isinstance(data, dict) or 'grid' not in data:
+            return jsonify({'success': False, 'error': 'Expected candidate(s) and grid'}), 400
+        
+        candidates = data.get('candidates', [data.get('candidate', {})])
+        if (not isinstance(candidates, list) or not candidates
+                or not all(isinstance(c, dict) for c in candidates)):
+            return jsonify({'success': False, 'error': 'Expected list of candidate objects'}), 400
+        
+        if not isinstance(data['grid'], dict):
+            return jsonify({'success': False, 'error': 'grid must map feature names to values'}), 400
+        
+        # Optional explicit axis order, since JSON object key order is not guaranteed
+        features = data.get('features', list(data['grid']))
+        if (not isinstance(features, list) or not all(isinstance(f, str) for f in features)
+                or set(features) != set(data['grid'])):
+            return jsonify({'success': False, 'error': 'features must match the grid keys'}), 400
+        grid = {f: data['grid'][f] for f in features}
+        
+        # Enforce the row limit before any grid values are allocated
+        n_points = 1
+        for size in classifier.sweep_grid_shape(grid):
+            n_points *= size
+        if len(candidates) * n_points > MAX_BATCH_ROWS:
+            return _batch_too_large()
+        
+        grid = classifier.expand_sweep_grid(grid)
+        result = classifier.sweep(candidates, grid)
+        
+        return jsonify({'success': True, **result})
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/catalog/<object_id>', methods=['GET'])
+def catalog_lookup(object_id):
+    """Return the precomputed prediction for a catalogued object (e.g. K00752.01)."""
+    try:
+        result = catalog.lookup(object_id, model_version=request.args.get('version'))
+        
+        if result is None:
+            return jsonify({'success': False, 'error': f'Object not in catalog: {object_id}'}), 404
+        
+        return jsonify({'success': True, 'prediction': result})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/catalog', methods=['GET', 'POST'])
+@admitted(lambda: 'retrain' if request.method == 'POST' else 'interactive')
+def manage_catalog():
+    """
+    Get catalog status, or register a downloaded table and score it in bulk.
+    POST body: {"source": "kepler" | "tess", "path": "data/kepler_data.csv"}
+    Only files under the data/ directory can be registered.
+    """
+    try:
+        if request.method == 'GET':
+            return jsonify({
+                'success': True,
+                'active_version': catalog.active_version(),
+                'sources': catalog.get_sources(),
+                'versions': catalog.get_stats()
+            })
+        
+        elif request.method == 'POST':
+            data = request.json or {}
+            source = data.get('source', 'kepler')
+            id_column = data.get('id_column')
+            
+            if not isinstance(source, str) or not (id_column is None or isinstance(id_column, str)):
+                return jsonify({'success': False, 'error': 'source and id_column must be strings'}), 400
+            if source not in ID_COLUMNS and id_column is None:
+                return jsonify({'success': False, 'error': f'Unknown source: {source}'}), 400
+            
+            path = data.get('path', os.path.join(DATA_DIR, f'{source}_data.csv'))
+            if not isinstance(path, str):
+                return jsonify({'success': False, 'error': 'path must be a string'}), 400
+            
+            # Confine sources to the data directory (after resolving symlinks and '..')
+            data_dir = os.path.realpath(DATA_DIR)
+            resolved = os.path.realpath(path)
+            if os.path.commonpath([data_dir, resolved]) != data_dir:
+                return jsonify({'success': False, 'error': f'Path must be inside {DATA_DIR}/: {path}'}), 400
+            if not os.path.isfile(resolved):
+                return jsonify({'success': False, 'error': f'Data file not found: {path}'}), 400
+            
+            catalog.register_source(source, resolved, id_column)
+            # build() only scores rows missing for the current version
+            counts = catalog.build(classifier)
+            
+            return jsonify({
+                'success': True,
+                'active_version': catalog.active_version(),
+                'scored': counts
+            })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/metrics', methods=['GET'])
 def get_metrics():
     """Get current model performance metrics."""
@@ -110,14 +362,14 @@ def manage_hyperparameters():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/retrain', methods=['POST'])
+@admitted('retrain')
 def retrain_model():
     """
     Retrain the model with optional new data.
     Can accept CSV file or use existing training data.
     """
+    data_path = None
     try:
-        data_path = None
-        
         if 'file' in request.files:
             # Save uploaded file temporarily
             file = request.files['file']
@@ -126,21 +378,39 @@ def retrain_model():
         
         # Retrain model
         print("Retraining model...")
-        metrics = classifier.train(data_path=data_path)
+        memory_lean = request.values.get('memory_lean', 'false').lower() == 'true'
+        use_cache = request.values.get('use_cache', 'true').lower() == 'true'
+        metrics = classifier.train(
+            data_path=data_path,
+            memory_lean=memory_lean,
+            cache=training_cache if use_cache else None
+        )
         classifier.save()
         
-        # Clean up temp file
-        if data_path and os.path.exists(data_path):
-            os.remove(data_path)
-        
-        return jsonify({
+        response = {
             'success': True,
             'message': 'Model retrained successfully',
             'metrics': metrics
-        })
+        }
+        
+        # Rescore catalogued objects with the promoted model; the new model is
+        # already saved, so a failure here is reported but not fatal
+        if catalog.get_sources():
+            try:
+                response['catalog'] = {'success': True, 'scored': catalog.refresh(classifier)}
+            except Exception as e:
+                print(f"Catalog refresh failed: {e}")
+                response['catalog'] = {'success': False, 'error': str(e)}
+        
+        return jsonify(response)
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+    
+    finally:
+        # Clean up temp file
+        if data_path and os.path.exists(data_path):
+            os.remove(data_path)
 
 @app.route('/api/features', methods=['GET'])
 def get_features():
@@ -195,6 +465,7 @@ def get_sample_data():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/batch-predict', methods=['POST'])
+@admitted('bulk')
 def batch_predict():
     """
     Batch prediction endpoint for processing multiple entries.
@@ -206,6 +477,9 @@ def batch_predict():
             return jsonify({'success': False, 'error': 'Expected list of data points'}), 400
         
         df = pd.DataFrame(data)
+        if len(df) > MAX_BATCH_ROWS:
+            return _batch_too_large()
+        
         results = classifier.predict(df)
         
         # Add input data to results
@@ -221,6 +495,11 @@ def batch_predict():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/admission', methods=['GET'])
+def get_admission_stats():
+    """Get queue depth, concurrency and rejection counters per lane."""
+    return jsonify({'success': True, 'admission': admission.get_stats()})
+
 if __name__ == '__main__':
     print("Starting Exoplanet Detection API...")
     print("API available at http://localhost:5000")
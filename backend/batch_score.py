@@ -0,0 +1,245 @@
+"""
+Offline bulk scoring of exoplanet candidate tables.
+
+Reads every CSV/Parquet file in an input directory, splits the rows into
+chunks scored by a process pool (each worker loads the trained model once),
+and writes one output partition per chunk. Partitions that already exist are
+skipped, so an interrupted run can be resumed by re-running the command with
+the same chunk size; a manifest per input file guards against resuming with
+a different chunk size or a changed input file. Parquet files need pyarrow
+(or fastparquet) and are skipped if neither is installed.
+
+Usage:
+    python batch_score.py data/archive predictions/ --workers 8
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+from model import ExoplanetClassifier
+
+INPUT_EXTENSIONS = ('.csv', '.parquet')
+MANIFEST_NAME = '_manifest.json'
+
+# Per-worker classifier, loaded once by _init_worker
+_classifier = None
+
+
+def _init_worker(model_path, processor_path):
+    """Load the model once per worker process."""
+    global _classifier
+    _classifier = ExoplanetClassifier()
+    _classifier.load(model_path, processor_path)
+
+    # Parallelism comes from the pool; keep each worker single-threaded
+    model = _classifier.model
+    estimators = getattr(model, 'named_estimators_', {'model': model})
+    for estimator in estimators.values():
+        estimator.set_params(n_jobs=1)
+
+
+def _score_chunk(chunk, output_path):
+    """Score one chunk and write it as an output partition."""
+    results = pd.DataFrame(_classifier.predict(chunk), index=chunk.index)
+    scored = pd.concat([chunk, results], axis=1)
+
+    # Write to a temporary file first so a partition is never half-written
+    tmp_path = output_path + '.tmp'
+    if output_path.endswith('.parquet'):
+        scored.to_parquet(tmp_path, index=False)
+    else:
+        scored.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, output_path)
+
+    return len(scored)
+
+
+def _iter_chunks(path, chunk_size):
+    """Yield DataFrame chunks of an input file."""
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def _parquet_available():
+    """Whether a Parquet engine for pandas is installed."""
+    return any(importlib.util.find_spec(engine) for engine in ('pyarrow', 'fastparquet'))
+
+
+def list_input_files(input_dir):
+    """Return the sorted list of scorable files in a directory."""
+    files = sorted(
+        os.path.join(input_dir, name) for name in os.listdir(input_dir)
+        if name.endswith(INPUT_EXTENSIONS)
+    )
+
+    if not _parquet_available():
+        skipped = [path for path in files if path.endswith('.parquet')]
+        for path in skipped:
+            print(f"Skipping {path}: reading Parquet requires pyarrow or fastparquet")
+        files = [path for path in files if path not in skipped]
+
+    return files
+
+
+def _read_manifest(partition_dir):
+    path = os.path.join(partition_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(partition_dir, manifest):
+    path = os.path.join(partition_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def _check_resume(path, partition_dir, chunk_size):
+    """
+    Raise ValueError if existing partitions were written with a different
+    chunk size or from a different version of the input file.
+    """
+    if not os.path.isdir(partition_dir):
+        return
+
+    manifest = _read_manifest(partition_dir)
+    has_partitions = any(name.startswith('part-') for name in os.listdir(partition_dir))
+
+    if manifest is None:
+        if has_partitions:
+            raise ValueError(f"{partition_dir} has partitions but no manifest; remove it to rescore {path}")
+        return
+
+    if manifest['chunk_size'] != chunk_size:
+        raise ValueError(
+            f"{partition_dir} was written with --chunk-size {manifest['chunk_size']}; "
+            f"resume with the same chunk size or remove it to rescore {path}"
+        )
+    if manifest['source_bytes'] != os.path.getsize(path):
+        raise ValueError(f"{path} changed since {partition_dir} was written; remove it to rescore")
+
+
+def score_directory(input_dir, output_dir, workers=None, chunk_size=50000,
+                    model_path='models/exoplanet_model.pkl',
+                    processor_path='models/data_processor.pkl'):
+    """
+    Score every file in input_dir and write partitioned predictions to output_dir.
+
+    Output layout: output_dir/<file name>/part-00000.<ext>, one partition per
+    chunk, plus a _manifest.json recording the chunk size and row count.
+
+    Returns:
+        Dictionary with row counts, skipped partitions and throughput
+    """
+    workers = workers or os.cpu_count()
+    files = list_input_files(input_dir)
+    if not files:
+        raise ValueError(f"No CSV or Parquet files found in {input_dir}")
+
+    # Refuse to resume incompatible outputs before doing any work
+    for path in files:
+        _check_resume(path, os.path.join(output_dir, os.path.basename(path)), chunk_size)
+
+    stats = {'files': len(files), 'partitions': 0, 'skipped': 0, 'rows': 0}
+    start_time = time.perf_counter()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(model_path, processor_path)
+    ) as pool:
+        pending = set()
+
+        for path in files:
+            # Keep the extension so a.csv and a.parquet do not share a directory
+            name = os.path.basename(path)
+            ext = os.path.splitext(name)[1]
+            partition_dir = os.path.join(output_dir, name)
+            os.makedirs(partition_dir, exist_ok=True)
+
+            # Record the chunk size before scoring so an interrupted run can be checked
+            manifest = _read_manifest(partition_dir) or {
+                'source': path,
+                'source_bytes': os.path.getsize(path),
+                'chunk_size': chunk_size,
+                'rows': None,
+                'partitions': None
+            }
+            _write_manifest(partition_dir, manifest)
+
+            n_rows = 0
+            n_chunks = 0
+            for i, chunk in enumerate(_iter_chunks(path, chunk_size)):
+                n_rows += len(chunk)
+                n_chunks += 1
+                output_path = os.path.join(partition_dir, f'part-{i:05d}{ext}')
+                if os.path.exists(output_path):
+                    stats['skipped'] += 1
+                    continue
+
+                # Bound the number of in-flight chunks to limit memory use
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stats['rows'] += future.result()
+                        stats['partitions'] += 1
+
+                pending.add(pool.submit(_score_chunk, chunk, output_path))
+
+            if manifest['rows'] is not None and manifest['rows'] != n_rows:
+                raise ValueError(f"{path} has {n_rows} rows, manifest records {manifest['rows']}")
+            manifest.update(rows=n_rows, partitions=n_chunks)
+            _write_manifest(partition_dir, manifest)
+
+        for future in pending:
+            stats['rows'] += future.result()
+            stats['partitions'] += 1
+
+    elapsed = time.perf_counter() - start_time
+    stats['seconds'] = elapsed
+    stats['rows_per_sec'] = stats['rows'] / elapsed if elapsed > 0 else 0.0
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-score exoplanet candidate tables.')
+    parser.add_argument('input_dir', help='Directory with CSV or Parquet files')
+    parser.add_argument('output_dir', help='Directory for partitioned predictions')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=50000,
+                        help='Rows per chunk / output partition')
+    parser.add_argument('--model-path', default='models/exoplanet_model.pkl')
+    parser.add_argument('--processor-path', default='models/data_processor.pkl')
+    args = parser.parse_args()
+
+    try:
+        stats = score_directory(
+            args.input_dir, args.output_dir,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            model_path=args.model_path,
+            processor_path=args.processor_path
+        )
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+
+    print(f"\nScored {stats['rows']} rows in {stats['partitions']} partitions "
+          f"from {stats['files']} files ({stats['skipped']} partitions already done)")
+    print(f"Elapsed: {stats['seconds']:.2f}s ({stats['rows_per_sec']:.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
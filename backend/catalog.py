@@ -0,0 +1,260 @@
+"""
+Precomputed prediction catalog for known objects (KOIs / TOIs).
+
+Scores entire downloaded tables in bulk and stores the results in an
+indexed SQLite database keyed by (model version, object identifier), so
+predictions for catalogued objects can be served without re-running the
+ensemble.
+"""
+
+import sqlite3
+import threading
+import os
+import pandas as pd
+from datetime import datetime
+
+# Identifier column for each supported source table
+ID_COLUMNS = {
+    'kepler': 'kepoi_name',
+    'tess': 'toi',
+}
+
+
+class PredictionCatalog:
+    """
+    On-disk store of precomputed predictions keyed by object identifier.
+    """
+
+    def __init__(self, db_path='models/catalog.db', chunk_size=5000):
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._create_tables()
+
+    def _connect(self):
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _create_tables(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS predictions (
+                    model_version TEXT NOT NULL,
+                    object_id TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    prediction TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    probability_confirmed REAL NOT NULL,
+                    probability_not_confirmed REAL NOT NULL,
+                    PRIMARY KEY (model_version, object_id)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sources (
+                    name TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    id_column TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS versions (
+                    model_version TEXT PRIMARY KEY,
+                    built_at TEXT NOT NULL,
+                    active INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+    def register_source(self, name, path, id_column=None):
+        """
+        Register a downloaded table so it is rescored on every model promotion.
+
+        Args:
+            name: Source name ('kepler', 'tess' or any custom name)
+            path: Path to the CSV file
+            id_column: Column holding the object identifier
+        """
+        id_column = id_column or ID_COLUMNS.get(name)
+        if id_column is None:
+            raise ValueError(f"No identifier column known for source: {name}")
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sources (name, path, id_column) VALUES (?, ?, ?)",
+                (name, path, id_column)
+            )
+
+    def get_sources(self):
+        """Return the registered source tables."""
+        rows = self._connect().execute("SELECT name, path, id_column FROM sources").fetchall()
+        return [dict(row) for row in rows]
+
+    def score_table(self, classifier, df, source, id_column, model_version):
+        """
+        Score a table in bulk and store predictions for the given model version.
+
+        Rows already stored for this version are skipped, so an interrupted
+        build resumes where it stopped. Feature columns absent from the table
+        (e.g. koi_model_snr in the TESS query) are left missing and filled by
+        the fitted imputer.
+
+        Returns:
+            Number of newly stored predictions
+        """
+        if id_column not in df.columns:
+            raise ValueError(f"Missing identifier column: {id_column}")
+
+        df = df.dropna(subset=[id_column]).drop_duplicates(subset=[id_column])
+        df = df.assign(**{id_column: df[id_column].astype(str)})
+
+        conn = self._connect()
+        stored = {
+            row[0] for row in conn.execute(
+                "SELECT object_id FROM predictions WHERE model_version = ?", (model_version,)
+            )
+        }
+        pending = df[~df[id_column].isin(stored)]
+
+        features = pending.reindex(columns=classifier.processor.feature_columns)
+
+        n_stored = 0
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = features.iloc[start:start + self.chunk_size]
+            ids = pending[id_column].iloc[start:start + self.chunk_size]
+            results = classifier.predict(chunk)
+
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (model_version, object_id, source, r['prediction'], r['confidence'],
+                         r['probability_confirmed'], r['probability_not_confirmed'])
+                        for object_id, r in zip(ids, results)
+                    ]
+                )
+            n_stored += len(results)
+
+        return n_stored
+
+    def build(self, classifier, model_version=None, activate=True):
+        """
+        Score every registered source for a model version.
+
+        Args:
+            classifier: Trained ExoplanetClassifier
+            model_version: Version key (defaults to classifier.version)
+            activate: Make this version the one served by lookup()
+
+        Returns:
+            Dictionary mapping source name to number of newly stored rows
+        """
+        model_version = model_version or classifier.version
+        if model_version is None:
+            raise ValueError("Model version unknown. Save or load the model first.")
+
+        counts = {}
+        for src in self.get_sources():
+            if not os.path.exists(src['path']):
+                print(f"Catalog source not found, skipping: {src['path']}")
+                continue
+            # Read ids as text so e.g. TOI '1000.10' is not parsed to 1000.1
+            df = pd.read_csv(src['path'], dtype={src['id_column']: str})
+            counts[src['name']] = self.score_table(
+                classifier, df, src['name'], src['id_column'], model_version
+            )
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO versions (model_version, built_at) VALUES (?, ?)",
+                (model_version, datetime.now().isoformat())
+            )
+            if activate:
+                conn.execute("UPDATE versions SET active = (model_version = ?)", (model_version,))
+
+        print(f"Catalog built for model version {model_version}: {counts}")
+        return counts
+
+    def refresh(self, classifier, keep_versions=2):
+        """
+        Bring the catalog up to date after a model promotion.
+
+        Only the new version is scored; older versions beyond keep_versions
+        are pruned. Nothing is rescored if the model version is unchanged.
+        """
+        if classifier.version is not None and classifier.version == self.active_version():
+            print(f"Catalog already up to date for model version {classifier.version}")
+            return {}
+
+        counts = self.build(classifier)
+        self.prune(keep_versions)
+        return counts
+
+    def prune(self, keep_versions=2):
+        """Delete predictions of all but the most recent keep_versions versions."""
+        conn = self._connect()
+        stale = [
+            row[0] for row in conn.execute(
+                "SELECT model_version FROM versions WHERE active = 0 "
+                "ORDER BY built_at DESC LIMIT -1 OFFSET ?",
+                (max(keep_versions - 1, 0),)
+            )
+        ]
+        with conn:
+            for version in stale:
+                conn.execute("DELETE FROM predictions WHERE model_version = ?", (version,))
+                conn.execute("DELETE FROM versions WHERE model_version = ?", (version,))
+        return stale
+
+    def active_version(self):
+        """Return the model version currently served by lookup()."""
+        row = self._connect().execute(
+            "SELECT model_version FROM versions WHERE active = 1"
+        ).fetchone()
+        return row[0] if row else None
+
+    def lookup(self, object_id, model_version=None):
+        """
+        Return the stored prediction for an object, or None if not catalogued.
+        """
+        model_version = model_version or self.active_version()
+        row = self._connect().execute(
+            "SELECT object_id, source, model_version, prediction, confidence, "
+            "probability_confirmed, probability_not_confirmed "
+            "FROM predictions WHERE model_version = ? AND object_id = ?",
+            (model_version, str(object_id))
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_stats(self):
+        """Return row counts per model version."""
+        rows = self._connect().execute("""
+            SELECT v.model_version, v.built_at, v.active, COUNT(p.object_id) AS n_objects
+            FROM versions v LEFT JOIN predictions p ON p.model_version = v.model_version
+            GROUP BY v.model_version ORDER BY v.built_at DESC
+        """).fetchall()
+        return [dict(row) for row in rows]
+
+
+if __name__ == "__main__":
+    from model import ExoplanetClassifier
+
+    classifier = ExoplanetClassifier()
+    classifier.load()
+
+    catalog = PredictionCatalog()
+    catalog.register_source('kepler', 'data/kepler_data.csv')
+    if os.path.exists('data/tess_data.csv'):
+        catalog.register_source('tess', 'data/tess_data.csv')
+
+    catalog.refresh(classifier)
+    for stats in catalog.get_stats():
+        print(stats)
@@ -108,6 +108,53 @@ class ExoplanetDataProcessor:
         
         return X_scaled
     
+    def preprocess_lean(self, df, fit=False, dtype=np.float32, row_order=None):
+        """
+        Memory-lean variant of preprocess() for training.
+        
+        Fills a single array of the given dtype one column at a time,
+        imputing each column as it is copied, then scales the array in place.
+        Rows can be written directly in a given order, so a train/test split
+        needs no further copy. Produces the same values as preprocess() up to
+        floating point precision.
+        
+        Args:
+            df: Input dataframe
+            fit: Whether to fit the scaler and imputer (True for training data)
+            dtype: Floating point dtype of the returned array
+            row_order: Optional array of row positions; row i of the result
+                is row row_order[i] of df
+        
+        Returns:
+            Preprocessed C-contiguous feature array
+        """
+        # Fit the imputer on the DataFrame so it records the feature names;
+        # only its per-column medians are used below
+        if fit:
+            self.imputer.fit(df[self.feature_columns])
+            self.is_fitted = True
+        elif not self.is_fitted:
+            raise ValueError("Processor must be fitted before transforming data")
+        
+        n_rows = len(df) if row_order is None else len(row_order)
+        X = np.empty((n_rows, len(self.feature_columns)), dtype=dtype)
+        
+        # Copy and impute column by column
+        for j, col in enumerate(self.feature_columns):
+            values = df[col].to_numpy(dtype=dtype)
+            if row_order is not None:
+                values = values[row_order]
+            values[np.isnan(values)] = self.imputer.statistics_[j]
+            X[:, j] = values
+        
+        # Scale features in place
+        if fit:
+            self.scaler.fit(X)
+        X -= self.scaler.mean_.astype(dtype)
+        X /= self.scaler.scale_.astype(dtype)
+        
+        return X
+    
     def prepare_labels(self, df):
         """
         Convert disposition labels to binary classification.
@@ -135,15 +182,34 @@ class ExoplanetDataProcessor:
         y = df['koi_disposition'].map(label_map)
         return y.values
     
-    def save(self, filepath='models/data_processor.pkl'):
-        """Save the fitted processor."""
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        joblib.dump({
+    def get_config(self):
+        """Return the preprocessing configuration (independent of fitted state)."""
+        return {
+            'feature_columns': self.feature_columns,
+            'imputer': self.imputer.get_params(),
+            'scaler': self.scaler.get_params()
+        }
+    
+    def get_state(self):
+        """Return the fitted processor state."""
+        return {
             'scaler': self.scaler,
             'imputer': self.imputer,
             'feature_columns': self.feature_columns,
             'is_fitted': self.is_fitted
-        }, filepath)
+        }
+    
+    def set_state(self, state):
+        """Restore a state returned by get_state()."""
+        self.scaler = state['scaler']
+        self.imputer = state['imputer']
+        self.feature_columns = state['feature_columns']
+        self.is_fitted = state['is_fitted']
+    
+    def save(self, filepath='models/data_processor.pkl'):
+        """Save the fitted processor."""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        joblib.dump(self.get_state(), filepath)
         print(f"Data processor saved to {filepath}")
     
     def load(self, filepath='models/data_processor.pkl'):
@@ -151,11 +217,7 @@ class ExoplanetDataProcessor:
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Processor file not found: {filepath}")
         
-        data = joblib.load(filepath)
-        self.scaler = data['scaler']
-        self.imputer = data['imputer']
-        self.feature_columns = data['feature_columns']
-        self.is_fitted = data['is_fitted']
+        self.set_state(joblib.load(filepath))
         print(f"Data processor loaded from {filepath}")
     
     def validate_input(self, df):
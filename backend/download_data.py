@@ -19,6 +19,7 @@ def download_kepler_data(output_path='data/kepler_data.csv'):
     # ADQL query to get relevant columns
     query = """
     SELECT 
+        kepoi_name,
         koi_period, koi_time0bk, koi_impact, koi_duration,
         koi_depth, koi_prad, koi_teq, koi_insol,
         koi_model_snr, koi_steff, koi_slogg, koi_srad,
@@ -82,6 +83,7 @@ def download_tess_data(output_path='data/tess_data.csv'):
     # Note: TESS uses different column names, this is a simplified example
     query = """
     SELECT 
+        toi,
         pl_orbper as koi_period,
         pl_tranmid as koi_time0bk,
         pl_imppar as koi_impact,
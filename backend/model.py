@@ -6,7 +6,11 @@ from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_sc
 import xgboost as xgb
 import joblib
 import os
+import sys
+import hashlib
+import tracemalloc
 from data_processor import ExoplanetDataProcessor
+from training_cache import TrainingCache
 
 class ExoplanetClassifier:
     """
@@ -20,6 +24,7 @@ class ExoplanetClassifier:
         self.processor = ExoplanetDataProcessor()
         self.metrics = {}
         self.feature_importance = None
+        self.version = None
         
         # Default hyperparameters
         self.hyperparameters = {
@@ -72,37 +77,96 @@ class ExoplanetClassifier:
         
         return self.model
     
-    def train(self, data_path=None, test_size=0.2):
+    def train(self, data_path=None, test_size=0.2, memory_lean=False, cache=None):
         """
         Train the model on exoplanet data.
         
         Args:
             data_path: Path to CSV file with training data
             test_size: Proportion of data to use for testing
+            memory_lean: Build one float32 feature buffer in split order,
+                impute and scale it in place, and take train/test as views
+                of it (lower peak memory)
+            cache: Optional TrainingCache. Runs with identical data,
+                preprocessing, model type and hyperparameters return the
+                cached model; runs on identical data reuse the fitted
+                preprocessor and train/test split.
         
         Returns:
             Dictionary with training metrics
         """
+        memory_probe = self._start_memory_probe()
+        
         print("Loading data...")
         df = self.processor.load_kepler_data(data_path)
         
-        print("Preprocessing data...")
-        X = self.processor.preprocess(df, fit=True)
-        y = self.processor.prepare_labels(df)
-        
-        print(f"Dataset shape: {X.shape}")
-        print(f"Class distribution: {np.bincount(y)}")
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=42, stratify=y
+        # The training inputs determine the fitted model (all seeds are fixed),
+        # so their hash doubles as a stable model version
+        prep_key = TrainingCache.make_key(
+            TrainingCache.hash_dataframe(df), self.processor.get_config(), test_size, memory_lean
         )
+        train_key = TrainingCache.make_key(prep_key, self.model_type, self.hyperparameters)
+        
+        prepared = None
+        if cache is not None:
+            cached = cache.get('models', train_key)
+            if cached is not None:
+                print("Training cache hit, reusing trained model")
+                self.model = cached['model']
+                # Memory figures of the original run do not describe this one
+                self.metrics = dict(cached['metrics'])
+                self.metrics['peak_rss_mb'] = self._stop_memory_probe(memory_probe)
+                self.metrics['cache_hit'] = True
+                self.feature_importance = cached['feature_importance']
+                self.processor.set_state(cached['processor'])
+                self.version = train_key[:16]
+                return self.metrics
+            
+            prepared = cache.get('prep', prep_key)
+        
+        if prepared is not None:
+            print("Reusing cached preprocessing")
+            self.processor.set_state(prepared['processor'])
+            X_train, X_test, y_train, y_test = prepared['split']
+        else:
+            print("Preprocessing data...")
+            if memory_lean:
+                # Split first, then build the feature buffer with training rows
+                # first so train/test are views of it
+                y = self.processor.prepare_labels(df)
+                order, n_train = self._split_order(y, test_size)
+                X = self.processor.preprocess_lean(df, fit=True, row_order=order)
+                y = y[order]
+                del df
+            else:
+                X = self.processor.preprocess(df, fit=True)
+                y = self.processor.prepare_labels(df)
+            
+            print(f"Dataset shape: {X.shape}")
+            print(f"Class distribution: {np.bincount(y)}")
+            
+            # Split data
+            if memory_lean:
+                X_train, X_test = X[:n_train], X[n_train:]
+                y_train, y_test = y[:n_train], y[n_train:]
+                del X
+            else:
+                X_train, X_test, y_train, y_test = train_test_split(
+                    X, y, test_size=test_size, random_state=42, stratify=y
+                )
+            
+            if cache is not None:
+                cache.put('prep', prep_key, {
+                    'processor': self.processor.get_state(),
+                    'split': (X_train, X_test, y_train, y_test)
+                })
         
         print("Building model...")
         self.build_model()
         
         print("Training model...")
         self.model.fit(X_train, y_train)
+        self.version = train_key[:16]
         
         # Evaluate
         print("Evaluating model...")
@@ -127,15 +191,88 @@ class ExoplanetClassifier:
         # Feature importance
         self._calculate_feature_importance()
         
+        self.metrics['peak_rss_mb'] = self._stop_memory_probe(memory_probe)
+        self.metrics['cache_hit'] = False
+        
         print(f"\nModel Performance:")
         print(f"Accuracy: {self.metrics['accuracy']:.4f}")
         print(f"Precision: {self.metrics['precision']:.4f}")
         print(f"Recall: {self.metrics['recall']:.4f}")
         print(f"F1-Score: {self.metrics['f1_score']:.4f}")
         print(f"CV Score: {self.metrics['cv_mean']:.4f} (+/- {self.metrics['cv_std']:.4f})")
+        memory = self.metrics['peak_rss_mb']
+        print(f"Memory: {memory['before']:.1f} MB before, {memory['after']:.1f} MB peak during training "
+              f"(+{memory['delta']:.1f} MB, {memory['method']})")
+        
+        if cache is not None:
+            cache.put('models', train_key, {
+                'model': self.model,
+                'metrics': self.metrics,
+                'feature_importance': self.feature_importance,
+                'processor': self.processor.get_state()
+            })
         
         return self.metrics
     
+    @staticmethod
+    def _split_order(y, test_size):
+        """
+        Stratified train/test split expressed as a row order.
+        
+        Returns the row positions with training rows first, and the number
+        of training rows. Uses the same split as train_test_split on X.
+        """
+        train_idx, test_idx = train_test_split(
+            np.arange(len(y)), test_size=test_size, random_state=42, stratify=y
+        )
+        return np.concatenate([train_idx, test_idx]), len(train_idx)
+    
+    @staticmethod
+    def _proc_status_mb(field):
+        """Read a memory field (e.g. VmRSS, VmHWM) from /proc/self/status in MB."""
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+        raise OSError(f"{field} not found in /proc/self/status")
+    
+    def _start_memory_probe(self):
+        """
+        Start measuring the memory used by this training run.
+        
+        On Linux the process high-water mark (VmHWM) is reset through
+        /proc/self/clear_refs, so the peak reflects this run rather than
+        earlier requests. Elsewhere tracemalloc tracks peak allocations
+        made through Python and NumPy.
+        """
+        try:
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+            return {'method': 'vmhwm', 'before': self._proc_status_mb('VmRSS')}
+        except OSError:
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+            return {'method': 'tracemalloc', 'before': before, 'started': started}
+    
+    def _stop_memory_probe(self, probe):
+        """Return memory before and at peak during training, in MB."""
+        if probe['method'] == 'vmhwm':
+            peak = self._proc_status_mb('VmHWM')
+        else:
+            peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            if probe['started']:
+                tracemalloc.stop()
+        
+        return {
+            'method': probe['method'],
+            'before': probe['before'],
+            'after': peak,
+            'delta': peak - probe['before']
+        }
+    
     def _calculate_feature_importance(self):
         """Calculate and store feature importance."""
         feature_names = self.processor.get_feature_names()
@@ -184,6 +321,139 @@ class ExoplanetClassifier:
         predictions = self.model.predict(X)
         probabilities = self.model.predict_proba(X)
         
+        return self._format_results(predictions, probabilities)
+    
+    def predict_cascade(self, data, lower=0.1, upper=0.9, first_stage='xgb',
+                        first_stage_trees=None, compute_agreement=False):
+        """
+        Predict with a cheap first stage, escalating uncertain rows to the full ensemble.
+        
+        Rows whose first-stage probability of CONFIRMED lies outside
+        [lower, upper] are answered by the first stage alone; the rest are
+        re-scored by the soft-voting ensemble.
+        
+        Args:
+            data: DataFrame or dict with feature values
+            lower: Lower bound of the uncertainty band
+            upper: Upper bound of the uncertainty band
+            first_stage: Ensemble member used as first stage ('xgb' or 'rf')
+            first_stage_trees: Optional number of trees/boosting rounds to use
+                in the first stage (None uses the whole member)
+            compute_agreement: Also score every row with the full ensemble and
+                report how often the cascade agrees with it (for offline tuning)
+        
+        Returns:
+            Dictionary with predictions and cascade statistics
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call train() first or load a trained model.")
+        
+        if not 0.0 <= lower <= upper <= 1.0:
+            raise ValueError("Uncertainty band must satisfy 0 <= lower <= upper <= 1")
+        
+        if first_stage_trees is not None and int(first_stage_trees) < 1:
+            raise ValueError("first_stage_trees must be at least 1")
+        
+        # Only the soft-voting ensemble has a cheaper member to fall back on
+        if self.model_type != 'ensemble':
+            results = self.predict(data)
+            return {
+                'predictions': results,
+                'cascade': {
+                    'first_stage': None,
+                    'total': len(results),
+                    'escalated': 0,
+                    'escalated_fraction': 0.0
+                }
+            }
+        
+        # Convert to DataFrame if dict
+        if isinstance(data, dict):
+            data = pd.DataFrame([data])
+        
+        # Validate and preprocess
+        self.processor.validate_input(data)
+        X = self.processor.preprocess(data, fit=False)
+        
+        # First stage
+        first_probabilities = self._first_stage_proba(X, first_stage, first_stage_trees).astype(np.float64)
+        # An untruncated first stage is itself an ensemble member, so its
+        # scores can be reused instead of running that member again
+        reuse = first_probabilities if first_stage_trees is None else None
+        
+        # Escalate rows inside the uncertainty band
+        probabilities = first_probabilities.copy()
+        escalate = (probabilities[:, 1] >= lower) & (probabilities[:, 1] <= upper)
+        if escalate.any():
+            probabilities[escalate] = self._ensemble_proba(
+                X[escalate], first_stage, None if reuse is None else reuse[escalate]
+            )
+        predictions = probabilities.argmax(axis=1)
+        
+        n_rows = len(predictions)
+        stats = {
+            'first_stage': first_stage,
+            'lower': float(lower),
+            'upper': float(upper),
+            'total': int(n_rows),
+            'escalated': int(escalate.sum()),
+            'escalated_fraction': float(escalate.mean()) if n_rows else 0.0
+        }
+        
+        if compute_agreement:
+            full_probabilities = self._ensemble_proba(X, first_stage, reuse)
+            full_predictions = full_probabilities.argmax(axis=1)
+            stats['agreement'] = float((predictions == full_predictions).mean()) if n_rows else 1.0
+            stats['max_probability_diff'] = (
+                float(np.abs(probabilities[:, 1] - full_probabilities[:, 1]).max()) if n_rows else 0.0
+            )
+        
+        return {
+            'predictions': self._format_results(predictions, probabilities),
+            'cascade': stats
+        }
+    
+    def _first_stage_proba(self, X, first_stage, n_trees=None):
+        """Score X with a single (optionally truncated) ensemble member."""
+        if first_stage not in self.model.named_estimators_:
+            raise ValueError(f"Unknown first stage: {first_stage}")
+        
+        member = self.model.named_estimators_[first_stage]
+        
+        if n_trees is None:
+            return member.predict_proba(X)
+        
+        n_trees = int(n_trees)
+        if first_stage == 'xgb':
+            available = member.get_booster().num_boosted_rounds()
+        else:
+            available = len(member.estimators_)
+        if not 1 <= n_trees <= available:
+            raise ValueError(f"first_stage_trees must be between 1 and {available} for {first_stage}")
+        
+        if first_stage == 'xgb':
+            return member.predict_proba(X, iteration_range=(0, n_trees))
+        
+        # Average class probabilities over a subset of the forest
+        trees = member.estimators_[:n_trees]
+        return np.mean([tree.predict_proba(X) for tree in trees], axis=0)
+    
+    def _ensemble_proba(self, X, first_stage, first_probabilities=None):
+        """
+        Soft-voting ensemble probabilities, reusing the first-stage member's
+        probabilities when they are given.
+        """
+        if first_probabilities is None:
+            return self.model.predict_proba(X)
+        
+        member_probabilities = [
+            first_probabilities if name == first_stage else member.predict_proba(X)
+            for name, member in self.model.named_estimators_.items()
+        ]
+        return np.average(member_probabilities, axis=0, weights=self.model.weights)
+    
+    def _format_results(self, predictions, probabilities):
+        """Convert raw predictions and probabilities into API result dicts."""
         results = []
         for i in range(len(predictions)):
             results.append({
@@ -195,6 +465,136 @@ class ExoplanetClassifier:
         
         return results
     
+    @staticmethod
+    def sweep_grid_shape(grid):
+        """
+        Validate a sweep specification and return its axis sizes without
+        allocating the grid.
+        
+        Args:
+            grid: Dict mapping one or two feature names to either a list of
+                values or a range {'start', 'stop', 'num', 'log'}
+        
+        Returns:
+            Tuple with the number of values per swept feature
+        """
+        if not isinstance(grid, dict) or not 1 <= len(grid) <= 2:
+            raise ValueError("Sweep must vary one or two features")
+        
+        shape = []
+        for feature, spec in grid.items():
+            if isinstance(spec, dict):
+                if 'start' not in spec or 'stop' not in spec:
+                    raise ValueError(f"Sweep range for {feature} needs start and stop")
+                size = int(spec.get('num', 50))
+            elif isinstance(spec, (list, tuple, np.ndarray)):
+                size = len(spec)
+            else:
+                raise ValueError(f"Sweep values for {feature} must be a list or a range")
+            
+            if size < 1:
+                raise ValueError(f"Sweep for {feature} needs at least one value")
+            shape.append(size)
+        
+        return tuple(shape)
+    
+    @staticmethod
+    def expand_sweep_grid(grid):
+        """
+        Expand a sweep specification into explicit value arrays.
+        
+        Callers should check sweep_grid_shape() against their size limit
+        first, since ranges are materialized here.
+        
+        Args:
+            grid: Sweep specification, see sweep_grid_shape()
+        
+        Returns:
+            Dict mapping feature name to a 1-D float array
+        """
+        ExoplanetClassifier.sweep_grid_shape(grid)
+        
+        expanded = {}
+        for feature, spec in grid.items():
+            if isinstance(spec, dict):
+                num = int(spec.get('num', 50))
+                if spec.get('log', False):
+                    values = np.geomspace(float(spec['start']), float(spec['stop']), num)
+                else:
+                    values = np.linspace(float(spec['start']), float(spec['stop']), num)
+            else:
+                values = np.asarray(spec, dtype=np.float64)
+            
+            if values.ndim != 1:
+                raise ValueError(f"Sweep values for {feature} must be a flat list")
+            if not np.all(np.isfinite(values)):
+                raise ValueError(f"Sweep values for {feature} must be finite")
+            expanded[feature] = values
+        
+        return expanded
+    
+    def sweep(self, candidates, grid):
+        """
+        Evaluate the probability of CONFIRMED over a grid of one or two features.
+        
+        Each candidate is preprocessed once; the swept columns are then
+        overwritten with scaled grid values and every (candidate, grid point)
+        row is scored in a single batch.
+        
+        Args:
+            candidates: DataFrame, dict or list of dicts (swept features may be omitted)
+            grid: Sweep specification, see expand_sweep_grid()
+        
+        Returns:
+            Dictionary with the grid values and one probability curve (1 feature)
+            or surface (2 features, indexed [i][j]) per candidate
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call train() first or load a trained model.")
+        
+        grid = self.expand_sweep_grid(grid)
+        features = list(grid)
+        feature_columns = self.processor.feature_columns
+        unknown = set(features) - set(feature_columns)
+        if unknown:
+            raise ValueError(f"Unknown sweep features: {unknown}")
+        
+        # Convert to DataFrame if dict / list
+        if isinstance(candidates, dict):
+            candidates = pd.DataFrame([candidates])
+        elif isinstance(candidates, list):
+            candidates = pd.DataFrame(candidates)
+        
+        # Swept values are overwritten below, so they need not be supplied
+        candidates = candidates.copy()
+        for feature in features:
+            if feature not in candidates.columns:
+                candidates[feature] = np.nan
+        
+        self.processor.validate_input(candidates)
+        X_base = self.processor.preprocess(candidates, fit=False)
+        
+        # Grid points in scaled feature space
+        cols = [feature_columns.index(f) for f in features]
+        mesh = np.meshgrid(*grid.values(), indexing='ij')
+        points = np.stack([m.ravel() for m in mesh], axis=1)
+        scaler = self.processor.scaler
+        points = (points - scaler.mean_[cols]) / scaler.scale_[cols]
+        
+        n_candidates, n_points = len(X_base), len(points)
+        X = np.repeat(X_base, n_points, axis=0)
+        X[:, cols] = np.tile(points, (n_candidates, 1))
+        
+        probabilities = self.model.predict_proba(X)[:, 1]
+        shape = (n_candidates,) + tuple(len(v) for v in grid.values())
+        probabilities = probabilities.reshape(shape)
+        
+        return {
+            'features': features,
+            'grid': {f: values.tolist() for f, values in grid.items()},
+            'probability_confirmed': probabilities.tolist()
+        }
+    
     def update_hyperparameters(self, new_params):
         """
         Update model hyperparameters and rebuild.
@@ -224,13 +624,14 @@ class ExoplanetClassifier:
             'model_type': self.model_type,
             'hyperparameters': self.hyperparameters,
             'metrics': self.metrics,
-            'feature_importance': self.feature_importance
+            'feature_importance': self.feature_importance,
+            'version': self.version
         }, model_path)
         
         # Save processor
         self.processor.save(processor_path)
         
-        print(f"Model saved to {model_path}")
+        print(f"Model saved to {model_path} (version {self.version})")
         print(f"Processor saved to {processor_path}")
     
     def load(self, model_path='models/exoplanet_model.pkl', processor_path='models/data_processor.pkl'):
@@ -249,14 +650,26 @@ class ExoplanetClassifier:
         # Load processor
         self.processor.load(processor_path)
         
-        print(f"Model loaded from {model_path}")
+        # Models saved before versions were stored fall back to a file hash
+        self.version = data.get('version') or self._file_version(model_path)
+        
+        print(f"Model loaded from {model_path} (version {self.version})")
         print(f"Model accuracy: {self.metrics.get('accuracy', 'N/A')}")
 
+    @staticmethod
+    def _file_version(model_path):
+        """Derive a model version key from the saved model file contents."""
+        digest = hashlib.sha256()
+        with open(model_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()[:16]
+
 if __name__ == "__main__":
     # Train and save model
     print("Training Exoplanet Classifier...")
     classifier = ExoplanetClassifier(model_type='ensemble')
-    metrics = classifier.train()
+    metrics = classifier.train(memory_lean='--memory-lean' in sys.argv)
     classifier.save()
     
     print("\nFeature Importance:")
@@ -0,0 +1,123 @@
+"""
+Content-addressed cache for training runs.
+
+Entries are keyed by a hash of the dataset contents, the preprocessing
+configuration, the hyperparameters, the model type and the installed
+library versions. Two kinds of entries are stored:
+
+- 'prep': fitted preprocessor and train/test split, shared by every run on
+  the same data regardless of model hyperparameters
+- 'models': trained model, metrics (including CV scores) and feature importance
+
+Least recently used entries are evicted once the cache exceeds its disk budget.
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+import sklearn
+import xgboost as xgb
+import joblib
+
+# Installed library versions; part of every key since they affect the fitted model
+LIBRARY_VERSIONS = {
+    'numpy': np.__version__,
+    'pandas': pd.__version__,
+    'scikit-learn': sklearn.__version__,
+    'xgboost': xgb.__version__,
+    'joblib': joblib.__version__,
+}
+
+
+class TrainingCache:
+    """
+    Disk-backed memoization of preprocessing and training results.
+    """
+
+    def __init__(self, cache_dir='models/cache', max_bytes=1 << 30):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_dataframe(df):
+        """Return a content hash of a DataFrame (columns and values)."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(list(map(str, df.columns))).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(*parts):
+        """Hash JSON-serializable key parts together with the library versions."""
+        payload = json.dumps([LIBRARY_VERSIONS, *parts], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, kind, key):
+        return os.path.join(self.cache_dir, f'{kind}-{key}.pkl')
+
+    def get(self, kind, key):
+        """Return a cached entry, or None on a miss."""
+        path = self._path(kind, key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            entry = joblib.load(path)
+        except Exception as e:
+            print(f"Discarding unreadable cache entry {path}: {e}")
+            os.remove(path)
+            return None
+
+        # Mark as recently used for eviction
+        os.utime(path)
+        return entry
+
+    def put(self, kind, key, value):
+        """Store an entry and evict old ones if over budget."""
+        path = self._path(kind, key)
+        tmp_path = path + '.tmp'
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits its budget."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = []
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            evicted.append(path)
+
+        return evicted
+
+    def clear(self):
+        """Remove every cache entry."""
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def get_stats(self):
+        """Return entry counts and disk usage."""
+        sizes = [
+            os.path.getsize(os.path.join(self.cache_dir, name))
+            for name in os.listdir(self.cache_dir) if name.endswith('.pkl')
+        ]
+        return {
+            'entries': len(sizes),
+            'bytes': int(sum(sizes)),
+            'max_bytes': int(self.max_bytes)
+        }
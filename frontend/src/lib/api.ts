@@ -19,6 +19,14 @@ export interface ModelMetrics {
   cv_std: number;
 }
 
+export interface SweepResult {
+  features: string[];
+  grid: Record<string, number[]>;
+  probability_confirmed: number[][] | number[][][];
+}
+
+export type SweepRange = { start: number; stop: number; num?: number; log?: boolean };
+
 export interface FeatureInfo {
   name: string;
   description: string;
@@ -73,4 +81,16 @@ export const api = {
     const response = await axios.post(`${API_BASE_URL}/batch-predict`, data);
     return response.data.predictions;
   },
+
+  async sweep(
+    candidates: any[],
+    grid: Record<string, number[] | SweepRange>,
+  ): Promise<SweepResult> {
+    const response = await axios.post(`${API_BASE_URL}/sweep`, {
+      candidates,
+      features: Object.keys(grid),
+      grid,
+    });
+    return response.data;
+  },
 };